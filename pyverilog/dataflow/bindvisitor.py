@@ -716,12 +716,9 @@ class BindVisitor(NodeVisitor):
         return ScopeChain(scopelist)
 
     def getModuleScopeChain(self, target):
-        remove_cnt = 0
-        length = len(target)
-        for scope in reversed(target):
-            if scope.scopetype == 'module':
-                return target[:length - remove_cnt]
-            remove_cnt += 1
+        for i in range(len(target) - 1, -1, -1):
+            if target[i].scopetype == 'module':
+                return target[:i + 1]
         raise verror.DefinitionError('module not found')
 
     def searchScopeTerminal(self, blocklabel, name, current):
@@ -1155,9 +1152,10 @@ class BindVisitor(NodeVisitor):
     def reduceIfScope(self, scope):
         if len(scope) == 0:
             return scope
-        if scope[-1].scopetype == 'if':
-            return scope[:-1]
-        return self.reduceIfScope(scope[:-1])
+        for i in range(len(scope) - 1, -1, -1):
+            if scope[i].scopetype == 'if':
+                return scope[:i]
+        return scope[:0]
 
     def resolveCondlist(self, condlist, scope):
         resolved_condlist = []
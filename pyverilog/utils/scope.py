@@ -10,115 +10,182 @@ from __future__ import absolute_import
 from __future__ import print_function
 import sys
 import os
-import copy
+import functools
+import weakref
+
+import pyverilog.utils.verror as verror
 
 scopetype_list_unprint = ('generate', 'always', 'function',  # 'functioncall',
                           'task', 'taskcall', 'initial', 'for', 'while', 'if')
 scopetype_list_print = ('module', 'block', 'signal', 'functioncall',)
 scopetype_list = scopetype_list_unprint + scopetype_list_print + ('any', )
 
+# sets for constant-time membership tests
+_scopetype_set = frozenset(scopetype_list)
+_unprint_set = frozenset(scopetype_list_unprint)
+_print_or_any_set = frozenset(scopetype_list_print + ('any', ))
+
 
 class ScopeLabel(object):
-    def __init__(self, scopename, scopetype='any', scopeloop=None):
-        self.scopename = scopename
-        if scopetype not in scopetype_list:
-            raise DefinitionError('No such Scope type')
-        self.scopetype = scopetype
-        self.scopeloop = scopeloop
+    __slots__ = ('scopename', 'scopetype', 'scopeloop',
+                 '_repr', '_printable', '_tocode', '_looptag', '_hash',
+                 '__weakref__')
+
+    # labels are immutable, so equal labels are shared as a single object.
+    # attributes can not be reassigned: a shared label may belong to many chains.
+    _cache = weakref.WeakValueDictionary()
+
+    def __new__(cls, scopename, scopetype='any', scopeloop=None):
+        key = (scopename, scopetype, scopeloop, type(scopeloop))
+        self = cls._cache.get(key)
+        if self is not None:
+            return self
+        if scopetype not in _scopetype_set:
+            raise verror.DefinitionError('No such Scope type')
+        self = object.__new__(cls)
+        setattr_ = object.__setattr__
+        setattr_(self, 'scopename', scopename)
+        setattr_(self, 'scopetype', scopetype)
+        setattr_(self, 'scopeloop', scopeloop)
+        # the derived values are computed only once per label
+        if scopeloop is None:
+            setattr_(self, '_repr', scopename)
+        else:
+            setattr_(self, '_repr', '%s[%s]' % (scopename, str(scopeloop)))
+        setattr_(self, '_printable', scopetype in _print_or_any_set)
+        setattr_(self, '_tocode', '' if scopetype in _unprint_set else scopename)
+        if scopetype == 'for' and scopeloop is not None:
+            setattr_(self, '_looptag', '_' + str(scopeloop) + '_')
+        else:
+            setattr_(self, '_looptag', None)
+        setattr_(self, '_hash', hash((scopename, scopeloop)))  # to use for dict key with any scopetype
+        cls._cache[key] = self
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ScopeLabel is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('ScopeLabel is immutable')
+
+    def __reduce__(self):
+        return (self.__class__, (self.scopename, self.scopetype, self.scopeloop))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __repr__(self):
-        ret = []
-        ret.append(self.scopename)
-        if self.scopeloop is not None:
-            ret.append('[')
-            ret.append(str(self.scopeloop))
-            ret.append(']')
-        return ''.join(ret)
+        return self._repr
 
     def tocode(self):
-        if self.scopetype in scopetype_list_unprint:
-            return ''
-        return self.scopename
+        return self._tocode
 
     def __eq__(self, other):
-        if type(self) != type(other):
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return False
+        if self.scopename != other.scopename or self.scopeloop != other.scopeloop:
             return False
         if self.scopetype == 'any' or other.scopetype == 'any':
-            return ((self.scopename, self.scopeloop)
-                    == (other.scopename, other.scopeloop))
-        return (self.scopename, self.scopetype, self.scopeloop) == (other.scopename, other.scopetype, other.scopeloop)
+            return True
+        return self.scopetype == other.scopetype
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __hash__(self):
-        # return hash((self.scopename, self.scopetype, self.scopeloop))
-        return hash((self.scopename, self.scopeloop))  # to use for dict key with any scopetype
+        return self._hash
 
     def isPrintable(self):
-        return self.scopetype in (scopetype_list_print + ('any',))
+        return self._printable
+
+
+# chains of the same shape share one mangled name across ScopeChain objects
+@functools.lru_cache(maxsize=4096)
+def _tocode_impl(labels):
+    ret = []
+    it = None
+    for l, looptag in labels:
+        if l:
+            ret.append(l)
+        if it is not None:
+            ret.append(it)
+        if l:
+            # ret.append('.')
+            # ret.append('_dot_')
+            ret.append('_')
+        it = looptag
+    if ret:
+        ret.pop()
+    return ''.join(ret)
 
 
 class ScopeChain(object):
+    __slots__ = ('scopechain', '_hash', '_tocode', '_repr', '_modules')
+
     def __init__(self, scopechain=None):
-        self.scopechain = []
+        # labels are kept in a tuple, since chains are rarely modified in place
+        self.scopechain = ()
         if scopechain is not None:
-            self.scopechain = scopechain
+            self.scopechain = tuple(scopechain)
+        self._clear_cache()
+
+    def _clear_cache(self):
+        self._hash = None
+        self._tocode = None
+        self._repr = None
+        self._modules = None
+
+    def __reduce__(self):
+        # cached values are not pickled: string hashes differ between processes
+        return (self.__class__, (self.scopechain,))
 
     def __add__(self, r):
-        new_chain = copy.deepcopy(self)
+        # labels are immutable, so the new chain shares them instead of copying
         if isinstance(r, ScopeLabel):
-            new_chain.append(r)
-        elif isinstance(r, ScopeChain):
-            new_chain.extend(r.scopechain)
-        else:
-            raise verror.DefinitionError('Can not add %s' % str(r))
-        return new_chain
+            return ScopeChain(self.scopechain + (r,))
+        if isinstance(r, ScopeChain):
+            return ScopeChain(self.scopechain + r.scopechain)
+        raise verror.DefinitionError('Can not add %s' % str(r))
 
     def append(self, r):
-        self.scopechain.append(r)
+        self.scopechain = self.scopechain + (r,)
+        self._clear_cache()
 
     def extend(self, r):
-        self.scopechain.extend(r)
+        self.scopechain = self.scopechain + tuple(r)
+        self._clear_cache()
 
     def tocode(self):
-        ret = []
-        it = None
-        for scope in self.scopechain:
-            l = scope.tocode()
-            if l:
-                ret.append(l)
-            if it is not None:
-                ret.append(it)
-            if l:
-                # ret.append('.')
-                # ret.append('_dot_')
-                ret.append('_')
-            if scope.scopetype == 'for' and scope.scopeloop is not None:
-                #it = '[' + str(scope.scopeloop) + ']'
-                #it = '_L_' + str(scope.scopeloop) + '_R_'
-                it = '_' + str(scope.scopeloop) + '_'
-            else:
-                it = None
-        ret = ret[:-1]
-        return ''.join(ret)
+        if self._tocode is None:
+            self._tocode = _tocode_impl(
+                tuple([(scope._tocode, scope._looptag) for scope in self.scopechain]))
+        return self._tocode
 
     def get_module_list(self):
-        return [scope for scope in self.scopechain if scope.scopetype == 'module']
+        if self._modules is None:
+            self._modules = tuple([scope for scope in self.scopechain
+                                   if scope.scopetype == 'module'])
+        return list(self._modules)
 
     def __repr__(self):
-        ret = ''
-        for scope in self.scopechain:
-            l = scope.__repr__()
-            ret += l + '.'
-        ret = ret[:-1]
-        return ret
+        if self._repr is None:
+            self._repr = '.'.join([scope.__repr__() for scope in self.scopechain])
+        return self._repr
 
     def __len__(self):
         return len(self.scopechain)
 
     def __eq__(self, other):
-        if type(self) != type(other):
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return False
+        if len(self.scopechain) != len(other.scopechain):
             return False
         return self.scopechain == other.scopechain
 
@@ -126,14 +193,14 @@ class ScopeChain(object):
         return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(tuple(self.scopechain))
+        if self._hash is None:
+            self._hash = hash(self.scopechain)
+        return self._hash
 
     def __getitem__(self, key):
         if isinstance(key, slice):
-            indices = key.indices(len(self))
-            return ScopeChain([self.scopechain[x] for x in range(*indices)])
+            return ScopeChain(self.scopechain[key])
         return self.scopechain[key]
 
     def __iter__(self):
-        for scope in self.scopechain:
-            yield scope
+        return iter(self.scopechain)
@@ -26,20 +26,15 @@ def toTermname(name):
 
 
 def toTermname_str(name):
-    scopechain_list = []
-    for n in name.split('.'):
-        # fix me: to support "module.scope.signal[ptr]", lexical analyzer is required.
-        scopechain_list.append(ScopeLabel(n, 'any'))
-    return ScopeChain(scopechain_list)
+    # fix me: to support "module.scope.signal[ptr]", lexical analyzer is required.
+    return ScopeChain([ScopeLabel(n, 'any') for n in name.split('.')])
 
 
 def toTermname_list(name):
-    scopechain_list = []
     for n in name:
         if not isinstance(n, str):
             raise TypeError()
-        scopechain_list.append(ScopeLabel(n, 'any'))
-    return ScopeChain(scopechain_list)
+    return ScopeChain([ScopeLabel(n, 'any') for n in name])
 
 
 def getScope(termname):
@@ -0,0 +1,76 @@
+from __future__ import absolute_import
+from __future__ import print_function
+import copy
+import os
+import pickle
+import subprocess
+import sys
+import pytest
+
+import pyverilog.utils.verror as verror
+from pyverilog.utils.scope import ScopeLabel, ScopeChain
+
+
+def test_label_interning():
+    a = ScopeLabel('top', 'module')
+    assert a is ScopeLabel('top', 'module')
+    assert a is not ScopeLabel('top', 'any')
+    assert a == ScopeLabel('top', 'any')
+
+    one = ScopeLabel('i', 'for', 1)
+    true = ScopeLabel('i', 'for', True)
+    assert one is not true
+    assert repr(one) == 'i[1]'
+    assert repr(true) == 'i[True]'
+
+    assert copy.copy(a) is a
+    assert copy.deepcopy(a) is a
+
+
+def test_label_immutable():
+    a = ScopeLabel('top', 'module')
+    with pytest.raises(AttributeError):
+        a.scopename = 'sub'
+    with pytest.raises(AttributeError):
+        del a.scopetype
+    assert a.scopename == 'top'
+    assert repr(ScopeChain([a])) == 'top'
+
+
+def test_label_unknown_scopetype():
+    with pytest.raises(verror.DefinitionError):
+        ScopeLabel('top', 'nosuchtype')
+
+
+def test_chain_pickle():
+    chain = ScopeChain([ScopeLabel('top', 'module'), ScopeLabel('x', 'signal')])
+    hash(chain)
+    chain.tocode()
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        d = pickle.loads(pickle.dumps({chain: 1}, protocol))
+        assert chain in d
+        assert repr(list(d)[0]) == 'top.x'
+
+
+def test_chain_pickle_across_processes():
+    chain = ScopeChain([ScopeLabel('top', 'module'), ScopeLabel('x', 'signal')])
+    hash(chain)
+    data = pickle.dumps({chain: 1})
+    code = ('import pickle, sys\n'
+            'from pyverilog.utils.scope import ScopeLabel, ScopeChain\n'
+            'd = pickle.loads(sys.stdin.buffer.read())\n'
+            "k = ScopeChain([ScopeLabel('top', 'module'), ScopeLabel('x', 'signal')])\n"
+            'sys.exit(0 if k in d else 1)\n')
+    env = dict(os.environ)
+    env['PYTHONHASHSEED'] = '1' if os.environ.get('PYTHONHASHSEED') == '2' else '2'
+    env['PYTHONPATH'] = os.pathsep.join(sys.path)
+    proc = subprocess.run([sys.executable, '-c', code], input=data, env=env)
+    assert proc.returncode == 0
+
+
+if __name__ == '__main__':
+    test_label_interning()
+    test_label_immutable()
+    test_label_unknown_scopetype()
+    test_chain_pickle()
+    test_chain_pickle_across_processes()